@@ -8,4 +8,13 @@ class APIConfig:
 
 @dataclass
 class DBConfig:
-    DB_PATH = os.path.join(os.path.dirname(__file__), "data", "stocks.db")
\ No newline at end of file
+    DB_PATH = os.path.join(os.path.dirname(__file__), "data", "stocks.db")
+
+@dataclass
+class ValidationConfig:
+    # A bar is a volume spike when its volume exceeds this multiple of the
+    # rolling median volume of the preceding bars
+    VOLUME_SPIKE_FACTOR = 50.0
+    VOLUME_WINDOW = 20
+    VOLUME_MIN_PERIODS = 5
+    AUDIT_CHUNKSIZE = 100_000
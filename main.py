@@ -1,3 +1,4 @@
+import argparse
 import logging
 from managers import StockDataManager
 from datetime import datetime, timedelta
@@ -10,9 +11,33 @@ def setup_logging():
     )
 
 
+def audit(manager: StockDataManager, quarantine: bool):
+    flagged = manager.audit_candlesticks(quarantine=quarantine)
+    if flagged.empty:
+        logging.info("No suspicious candlesticks found")
+        return
+    summary = flagged.groupby(['stock_code', 'adj_type']).size().sort_values(ascending=False)
+    for (stock_code, adj_type), count in summary.items():
+        logging.warning(f"{stock_code} ({adj_type}): {count} suspicious candlesticks")
+    if quarantine:
+        logging.info(f"Moved {len(flagged)} candlesticks to quarantine")
+
+
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", nargs="?", choices=["update", "audit"], default="update")
+    parser.add_argument("--quarantine", action="store_true",
+                        help="audit: move suspicious candlesticks into the quarantine table")
+    parser.add_argument("--refetch", action="store_true",
+                        help="update: re-fetch date ranges containing quarantined candlesticks")
+    args = parser.parse_args()
+
     setup_logging()
     manager = StockDataManager()
+
+    if args.command == "audit":
+        audit(manager, args.quarantine)
+        return
     
     # Update stock information first
     logging.info("Updating stock information...")
@@ -35,7 +60,8 @@ def main():
         start_date=start_date,
         end_date=end_date,
         adj_type="bc_rights",  # Using 后复权 as default
-        force=False  # Don't force update if data exists
+        force=False,  # Don't force update if data exists
+        refetch=args.refetch
     )
     
     # Log results
@@ -1,6 +1,7 @@
 from api.stock_api import StockAPI
 from models.stock_info import StockInfoDB
 from models.candlestick import CandlestickDB
+from models.validation import parse_dates
 from config import APIConfig, DBConfig
 from typing import Dict, Any, Optional
 import logging
@@ -69,7 +70,8 @@ class StockDataManager:
                                start_date: str,
                                end_date: str,
                                adj_type: str = "bc_rights",
-                               force: bool = False) -> Dict[str, Any]:
+                               force: bool = False,
+                               refetch: bool = False) -> Dict[str, Any]:
         """
         Update candlestick data for a stock
         Args:
@@ -78,6 +80,7 @@ class StockDataManager:
             end_date: End date in YYYY-MM-DD format
             adj_type: Adjustment type (bc_rights by default)
             force: If True, update even if data exists
+            refetch: If True, fetch the date range of quarantined bars once more
         """
         try:
             # Check if we already have the data
@@ -100,14 +103,19 @@ class StockDataManager:
             )
             
             if response.get('code') == 1 and response.get('data'):
-                self.candlestick_db.upsert_candlesticks(
+                written = self.candlestick_db.upsert_candlesticks(
                     stock_code=stock_code,
                     candlesticks=response['data'],
                     adj_type=adj_type
                 )
-                count = len(response['data'])
+                if refetch and not written['quarantined'].empty:
+                    written = self._refetch_quarantined(stock_code, response['data'], written, adj_type, market)
+                count = written['written']
+                quarantined = written['quarantined']
                 logging.info(f"Successfully updated {count} candlesticks for {stock_code}")
-                return {"success": True, "count": count, "cached": False}
+                if not quarantined.empty:
+                    logging.warning(f"{len(quarantined)} candlesticks for {stock_code} remain in quarantine")
+                return {"success": True, "count": count, "quarantined": len(quarantined), "cached": False}
             else:
                 error = f"API returned unexpected response: {response}"
                 logging.error(error)
@@ -117,6 +125,62 @@ class StockDataManager:
             logging.error(error)
             return {"success": False, "error": error}
 
+    def _refetch_quarantined(self, stock_code: str, candlesticks: list, written: Dict[str, Any],
+                             adj_type: str, market: str) -> Dict[str, Any]:
+        """
+        Fetch the date range covering quarantined bars again and write it.
+        Args:
+            candlesticks: The bars of the first fetch
+            written: Result of upserting the first fetch
+        Returns:
+            Dict with the number of bars of the first fetch now written and the bars still quarantined
+        """
+        quarantined = written['quarantined']
+        dates = quarantined['date'][parse_dates(quarantined['date']).notna()].str[:10]
+        if dates.empty:
+            return written
+        start_date, end_date = dates.min(), dates.max()
+        logging.info(f"Re-fetching {stock_code} from {start_date} to {end_date} for {len(quarantined)} quarantined bars")
+        response = self.api.get_candlestick_data(
+            stock_code=stock_code,
+            start_date=start_date,
+            end_date=end_date,
+            adj_type=adj_type,
+            market=market
+        )
+        if response.get('code') != 1 or not response.get('data'):
+            logging.error(f"Re-fetch for {stock_code} returned unexpected response: {response}")
+            return written
+        refetched = self.candlestick_db.upsert_candlesticks(
+            stock_code=stock_code,
+            candlesticks=response['data'],
+            adj_type=adj_type
+        )
+
+        # Bars of the first fetch that the re-fetch returned again were rewritten by it
+        first_dates = pd.Series([bar.get('date') for bar in candlesticks])
+        untouched = ~first_dates.isin({bar.get('date') for bar in response['data']})
+        clean = ~first_dates.index.isin(quarantined.index)
+        return {
+            "written": int((untouched & clean).sum()) + refetched['written'],
+            "quarantined": pd.concat([quarantined[untouched[quarantined.index].to_numpy()],
+                                      refetched['quarantined']]),
+        }
+
+    def get_quarantined_df(self, stock_code: Optional[str] = None, adj_type: Optional[str] = None) -> pd.DataFrame:
+        """Get quarantined candlesticks as a DataFrame"""
+        return self.candlestick_db.get_quarantined_df(stock_code, adj_type)
+
+    def audit_candlesticks(self, quarantine: bool = False) -> pd.DataFrame:
+        """
+        Validate every stored candlestick
+        Args:
+            quarantine: If True, move flagged bars into the quarantine table
+        """
+        flagged = self.candlestick_db.audit(quarantine=quarantine)
+        logging.info(f"Audit flagged {len(flagged)} candlesticks")
+        return flagged
+
     def get_ah_stock_list(self):
         """Get list of all AH stocks"""
         return self.stock_db.get_ah_stocks()
@@ -125,7 +189,8 @@ class StockDataManager:
                             start_date: str,
                             end_date: str,
                             adj_type: str = "bc_rights",
-                            force: bool = False) -> Dict[str, Any]:
+                            force: bool = False,
+                            refetch: bool = False) -> Dict[str, Any]:
         """
         Update candlestick data for all AH stocks
         Args:
@@ -133,6 +198,7 @@ class StockDataManager:
             end_date: End date in YYYY-MM-DD format
             adj_type: Adjustment type (bc_rights by default)
             force: If True, update even if data exists
+            refetch: If True, re-fetch ranges containing quarantined bars once
         """
         # First update stock info to ensure we have latest AH stock list
         self.update_stock_info()
@@ -152,7 +218,8 @@ class StockDataManager:
                     start_date=start_date,
                     end_date=end_date,
                     adj_type=adj_type,
-                    force=force
+                    force=force,
+                    refetch=refetch
                 )
                 
                 # Update A-share data
@@ -161,7 +228,8 @@ class StockDataManager:
                     start_date=start_date,
                     end_date=end_date,
                     adj_type=adj_type,
-                    force=force
+                    force=force,
+                    refetch=refetch
                 )
                 
                 if hk_result['success'] and a_result['success']:
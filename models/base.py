@@ -1,6 +1,6 @@
 from datetime import datetime
 import sqlite3
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import json
 import logging
 import pandas as pd
@@ -22,6 +22,13 @@ class BaseDBManager:
                 cursor.execute(query)
             conn.commit()
 
+    def execute_batch(self, statements: List[Tuple[str, List[tuple]]]):
+        """Execute each query for every one of its parameter tuples in a single transaction"""
+        with sqlite3.connect(self.db_path) as conn:
+            for query, params_seq in statements:
+                conn.executemany(query, params_seq)
+            conn.commit()
+
     def fetch_query(self, query: str, params: tuple = None) -> List[tuple]:
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
@@ -38,4 +45,10 @@ class BaseDBManager:
                 df = pd.read_sql_query(query, conn, params=params)
             else:
                 df = pd.read_sql_query(query, conn)
-            return df
\ No newline at end of file
+            return df
+
+    def iter_df_chunks(self, query: str, chunksize: int, params: tuple = None) -> Iterator[pd.DataFrame]:
+        """Execute query and yield results as DataFrames of at most chunksize rows"""
+        with sqlite3.connect(self.db_path) as conn:
+            for chunk in pd.read_sql_query(query, conn, params=params, chunksize=chunksize):
+                yield chunk
\ No newline at end of file
@@ -1,6 +1,9 @@
 from .base import BaseDBManager
-from typing import List, Dict, Any, Optional
+from .validation import BAR_COLUMNS, candlesticks_to_df, find_bad_bars, find_cross_adj_repeats, parse_dates
+from config import ValidationConfig
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+import logging
 import pandas as pd
 
 class CandlestickDB(BaseDBManager):
@@ -22,6 +25,24 @@ class CandlestickDB(BaseDBManager):
                 PRIMARY KEY (stock_code, date, adj_type)
             )
         ''')
+        self.execute_query('''
+            CREATE TABLE IF NOT EXISTS candlestick_quarantine (
+                stock_code TEXT,
+                date TEXT,
+                open REAL,
+                close REAL,
+                high REAL,
+                low REAL,
+                volume INTEGER,
+                amount REAL,
+                change REAL,
+                turnover_rate REAL,
+                adj_type TEXT,
+                reasons TEXT,
+                detected_at TIMESTAMP,
+                PRIMARY KEY (stock_code, date, adj_type)
+            )
+        ''')
 
     def get_latest_date(self, stock_code: str, adj_type: str = "bc_rights") -> Optional[str]:
         """Get the latest date for which we have data for a stock"""
@@ -72,27 +93,174 @@ class CandlestickDB(BaseDBManager):
         # Data is complete if we have records for all expected business days
         return actual_days >= expected_days
 
-    def upsert_candlesticks(self, stock_code: str, candlesticks: List[Dict[str, Any]], adj_type: str = "bc_rights"):
-        for stick in candlesticks:
-            self.execute_query('''
-                INSERT OR REPLACE INTO candlesticks (
-                    stock_code, date, open, close, high, low,
-                    volume, amount, change, turnover_rate, adj_type, last_updated
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                stock_code,
-                stick.get('date'),
-                stick.get('open'),
-                stick.get('close'),
-                stick.get('high'),
-                stick.get('low'),
-                stick.get('volume'),
-                stick.get('amount'),
-                stick.get('change'),
-                stick.get('to_r'),
-                adj_type,
-                datetime.now().isoformat()
-            ))
+    def upsert_candlesticks(self, stock_code: str, candlesticks: List[Dict[str, Any]],
+                            adj_type: str = "bc_rights", validate: bool = True) -> Dict[str, Any]:
+        """
+        Validate a batch of candlesticks and write it to the database.
+        Bars failing validation move to candlestick_quarantine, replacing any row already
+        stored in candlesticks for their date, and bars passing validation clear any
+        earlier quarantine entry for their date.
+
+        Returns:
+            Dict with the number of bars written and a DataFrame of quarantined bars
+        """
+        df = candlesticks_to_df(candlesticks)
+        df["stock_code"] = stock_code
+        df["adj_type"] = adj_type
+
+        if validate and not df.empty:
+            # Splice in stored history so spikes and stale repeats are judged in context,
+            # keeping the batch's own date direction so the seam is not out of order
+            dates = parse_dates(df["date"])
+            known = df["date"][dates.notna()]
+            context = self.fetch_df('''
+                SELECT * FROM (
+                    SELECT date, open, close, high, low, volume, amount, change, turnover_rate
+                    FROM candlesticks
+                    WHERE stock_code = ? AND adj_type = ? AND date < ?
+                    ORDER BY date DESC
+                    LIMIT ?
+                ) ORDER BY date ASC
+            ''', (stock_code, adj_type, known.min() if not known.empty else None, ValidationConfig.VOLUME_WINDOW))
+            ordered = dates.dropna()
+            if len(ordered) > 1 and ordered.iloc[0] > ordered.iloc[-1]:
+                reasons = find_bad_bars(pd.concat([df[context.columns], context.iloc[::-1]], ignore_index=True))
+                df["reasons"] = reasons.iloc[:len(df)].to_numpy()
+            else:
+                reasons = find_bad_bars(pd.concat([context, df[context.columns]], ignore_index=True))
+                df["reasons"] = reasons.iloc[len(context):].to_numpy()
+            if not known.empty:
+                repeats = self._cross_adj_repeats(stock_code, adj_type, df, known.min(), known.max())
+                df["reasons"] = df["reasons"].mask(repeats, (df["reasons"] + ",stale_adj_type").str.lstrip(","))
+        else:
+            df["reasons"] = ""
+
+        bad = df["reasons"] != ""
+        clean, quarantined = df[~bad], df[bad]
+        self.execute_batch([
+            self._candlesticks_statement(clean),
+            self._delete_statement("candlestick_quarantine", clean),
+            self._quarantine_statement(quarantined),
+            self._delete_statement("candlesticks", quarantined),
+        ])
+
+        if not quarantined.empty:
+            logging.warning(f"Quarantined {len(quarantined)} of {len(df)} candlesticks for {stock_code} ({adj_type})")
+        return {"written": len(clean), "quarantined": quarantined}
+
+    def _cross_adj_repeats(self, stock_code: str, adj_type: str, df: pd.DataFrame,
+                           start_date: str, end_date: str) -> pd.Series:
+        """Flag bars in df repeating another adjustment type's stored bars after the series diverged"""
+        others = self.fetch_df('''
+            SELECT adj_type, date, open, close, high, low
+            FROM candlesticks
+            WHERE stock_code = ? AND adj_type != ? AND date >= ? AND date <= ?
+        ''', (stock_code, adj_type, start_date, end_date))
+        if others.empty:
+            return pd.Series(False, index=df.index)
+        previous = self.fetch_df('''
+            SELECT o.adj_type, o.open, o.close, o.high, o.low,
+                   s.open AS own_open, s.close AS own_close, s.high AS own_high, s.low AS own_low
+            FROM candlesticks o
+            JOIN candlesticks s ON s.stock_code = o.stock_code AND s.date = o.date AND s.adj_type = ?
+            WHERE o.stock_code = ? AND o.adj_type != ? AND o.date = (
+                SELECT MAX(p.date)
+                FROM candlesticks p
+                JOIN candlesticks q ON q.stock_code = p.stock_code AND q.date = p.date AND q.adj_type = ?
+                WHERE p.stock_code = o.stock_code AND p.adj_type = o.adj_type AND p.date < ?
+            )
+        ''', (adj_type, stock_code, adj_type, adj_type, start_date))
+        return find_cross_adj_repeats(df, others, previous)
+
+    def _candlesticks_statement(self, df: pd.DataFrame) -> Tuple[str, List[tuple]]:
+        now = datetime.now().isoformat()
+        return '''
+            INSERT OR REPLACE INTO candlesticks (
+                stock_code, date, open, close, high, low,
+                volume, amount, change, turnover_rate, adj_type, last_updated
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [row + (now,) for row in self._rows(df, ["stock_code", "date"] + BAR_COLUMNS + ["adj_type"])]
+
+    def _quarantine_statement(self, df: pd.DataFrame) -> Tuple[str, List[tuple]]:
+        # Without a date a bar has no key to be cleared by, so it is dropped instead
+        undated = df["date"].isna()
+        if undated.any():
+            logging.warning(f"Dropping {int(undated.sum())} quarantined candlesticks without a date")
+            df = df[~undated]
+        now = datetime.now().isoformat()
+        return '''
+            INSERT OR REPLACE INTO candlestick_quarantine (
+                stock_code, date, open, close, high, low,
+                volume, amount, change, turnover_rate, adj_type, reasons, detected_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [row + (now,) for row in self._rows(df, ["stock_code", "date"] + BAR_COLUMNS + ["adj_type", "reasons"])]
+
+    def _delete_statement(self, table: str, df: pd.DataFrame) -> Tuple[str, List[tuple]]:
+        return f'''
+            DELETE FROM {table}
+            WHERE stock_code = ? AND date = ? AND adj_type = ?
+        ''', self._rows(df, ["stock_code", "date", "adj_type"])
+
+    @staticmethod
+    def _rows(df: pd.DataFrame, columns: List[str]) -> List[tuple]:
+        """Rows of df as tuples of plain Python values, with None for missing values"""
+        values = df[columns].astype(object)
+        return list(values.where(values.notna(), None).itertuples(index=False, name=None))
+
+    def get_quarantined_df(self, stock_code: Optional[str] = None, adj_type: Optional[str] = None) -> pd.DataFrame:
+        """Get quarantined candlesticks, optionally filtered by stock and adjustment type"""
+        return self.fetch_df('''
+            SELECT stock_code, adj_type, date, open, close, high, low, volume,
+                   amount, change, turnover_rate, reasons, detected_at
+            FROM candlestick_quarantine
+            WHERE (? IS NULL OR stock_code = ?) AND (? IS NULL OR adj_type = ?)
+            ORDER BY stock_code, adj_type, date
+        ''', (stock_code, stock_code, adj_type, adj_type))
+
+    def audit(self, chunksize: int = ValidationConfig.AUDIT_CHUNKSIZE, quarantine: bool = False) -> pd.DataFrame:
+        """
+        Run the validation checks over every stored candlestick, reading the table
+        in chunks of rows ordered by series so each chunk is checked column-wise.
+        Args:
+            chunksize: Number of rows read per chunk
+            quarantine: If True, move flagged bars from candlesticks to candlestick_quarantine
+        Returns:
+            DataFrame of flagged bars with a reasons column
+        """
+        flagged = []
+        carry = None
+        chunks = self.iter_df_chunks('''
+            SELECT stock_code, adj_type, date, open, close, high, low,
+                   volume, amount, change, turnover_rate
+            FROM candlesticks
+            ORDER BY stock_code, adj_type, date
+        ''', chunksize)
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+            # The last series may continue in the next chunk, so hold it back
+            last = (chunk["stock_code"] == chunk["stock_code"].iat[-1]) & (chunk["adj_type"] == chunk["adj_type"].iat[-1])
+            carry = chunk[last].reset_index(drop=True)
+            flagged.append(self._audit_chunk(chunk[~last]))
+        if carry is not None:
+            flagged.append(self._audit_chunk(carry))
+
+        result = pd.concat(flagged, ignore_index=True) if flagged else pd.DataFrame()
+        if quarantine and not result.empty:
+            self.execute_batch([
+                self._quarantine_statement(result),
+                self._delete_statement("candlesticks", result),
+            ])
+        return result
+
+    @staticmethod
+    def _audit_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+        if chunk.empty:
+            return chunk.assign(reasons=pd.Series(dtype=object))
+        reasons = find_bad_bars(chunk, group_cols=["stock_code", "adj_type"])
+        return chunk.assign(reasons=reasons)[reasons != ""]
 
     def get_candlesticks(self, stock_code: str, adj_type: str = "bc_rights") -> List[tuple]:
         """Get candlesticks for a specific stock and adjustment type as tuples"""
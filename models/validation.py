@@ -0,0 +1,121 @@
+from typing import List, Dict, Any, Sequence
+import numpy as np
+import pandas as pd
+from config import ValidationConfig
+
+PRICE_COLUMNS = ["open", "close", "high", "low"]
+BAR_COLUMNS = PRICE_COLUMNS + ["volume", "amount", "change", "turnover_rate"]
+
+
+def candlesticks_to_df(candlesticks: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Convert raw API candlesticks into a DataFrame with candlesticks table column names"""
+    df = pd.DataFrame.from_records(candlesticks).rename(columns={"to_r": "turnover_rate"})
+    df = df.reindex(columns=["date"] + BAR_COLUMNS)
+    df[BAR_COLUMNS] = df[BAR_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    return df
+
+
+def parse_dates(dates: pd.Series) -> pd.Series:
+    """Parse ISO 8601 dates of any precision or offset to UTC, with NaT for anything else"""
+    return pd.to_datetime(dates, errors="coerce", utc=True, format="ISO8601")
+
+
+def find_bad_bars(df: pd.DataFrame,
+                  group_cols: Sequence[str] = (),
+                  volume_spike_factor: float = ValidationConfig.VOLUME_SPIKE_FACTOR,
+                  volume_window: int = ValidationConfig.VOLUME_WINDOW,
+                  volume_min_periods: int = ValidationConfig.VOLUME_MIN_PERIODS) -> pd.Series:
+    """
+    Check every bar in a batch of candlesticks using column-wise array operations.
+
+    Args:
+        df: Candlesticks with date, open, close, high, low and volume columns
+        group_cols: Columns identifying a single series (e.g. stock_code, adj_type).
+                    Leave empty when df holds one series.
+        volume_spike_factor: Flag bars whose volume exceeds this multiple of the
+                             rolling median volume of the preceding bars
+        volume_window: Number of preceding bars in the rolling median
+        volume_min_periods: Minimum preceding bars needed before spikes are flagged
+
+    Returns:
+        Series aligned to df.index holding a comma separated list of failed
+        checks per bar, empty for bars that passed
+
+    Repeats of another adjustment type's bars need the stored series and are
+    checked separately by find_cross_adj_repeats.
+    """
+    group_cols = list(group_cols)
+    prices = df[PRICE_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    volume = pd.to_numeric(df["volume"], errors="coerce")
+    dates = parse_dates(df["date"])
+    grouper = [df[c] for c in group_cols] or [pd.Series(0, index=df.index)]
+
+    checks = {
+        "bad_date": dates.isna(),
+        "missing_price": prices.isna().any(axis=1),
+        "non_positive_price": (prices <= 0).any(axis=1),
+        "high_below_low": prices["high"] < prices["low"],
+        "outside_range": (prices["high"] < prices[["open", "close"]].max(axis=1))
+                         | (prices["low"] > prices[["open", "close"]].min(axis=1)),
+        "negative_volume": volume < 0,
+        "duplicate_date": df.duplicated(subset=group_cols + ["date"], keep="first"),
+    }
+
+    # Out-of-order: a step against the dominant direction of its series
+    step = np.sign(dates.groupby(grouper).diff().dt.total_seconds())
+    direction = np.sign(step.groupby(grouper).transform("sum")).replace(0, 1)
+    checks["out_of_order"] = (step * direction) < 0
+
+    # Sequence checks run on each series in chronological order
+    valid = ~(checks["bad_date"] | checks["duplicate_date"])
+    ordered = pd.DataFrame({"date": dates, "volume": volume}).join(prices)
+    for c in group_cols:
+        ordered[c] = df[c]
+    ordered = ordered[valid].sort_values(group_cols + ["date"], kind="mergesort")
+    keys = [ordered[c] for c in group_cols] or [pd.Series(0, index=ordered.index)]
+    by_series = ordered.groupby(keys, sort=False)
+
+    previous = by_series[PRICE_COLUMNS + ["volume"]].shift()
+    stale = (ordered[PRICE_COLUMNS + ["volume"]] == previous).all(axis=1) & (ordered["volume"] > 0)
+
+    baseline = (by_series["volume"].shift()
+                .groupby(keys, sort=False)
+                .rolling(volume_window, min_periods=volume_min_periods).median()
+                .droplevel(list(range(len(keys))))
+                .reindex(ordered.index))
+    spike = (baseline > 0) & (ordered["volume"] > volume_spike_factor * baseline)
+
+    checks["stale_repeat"] = stale.reindex(df.index, fill_value=False)
+    checks["volume_spike"] = spike.reindex(df.index, fill_value=False)
+
+    reasons = pd.Series("", index=df.index, dtype=object)
+    for name, mask in checks.items():
+        reasons = reasons.mask(mask.to_numpy(dtype=bool), reasons + name + ",")
+    return reasons.str.rstrip(",")
+
+
+def find_cross_adj_repeats(df: pd.DataFrame, others: pd.DataFrame, previous: pd.DataFrame) -> pd.Series:
+    """
+    Flag bars whose prices repeat another adjustment type's bar for the same date
+    although the two series had already diverged. Identical bars are normal until a
+    corporate action separates the series, so a repeat only counts as stale when
+    the last bar both series share before the batch differs.
+
+    Args:
+        df: Batch of candlesticks with date and price columns
+        others: Stored bars of the other adjustment types for the batch dates,
+                with adj_type, date and price columns
+        previous: The last bar each other adjustment type shares with this series
+                  before the batch, with adj_type, its price columns and this
+                  series' prices in own_ prefixed columns
+
+    Returns:
+        Boolean Series aligned to df.index
+    """
+    own = previous[["own_" + c for c in PRICE_COLUMNS]].to_numpy()
+    diverged = previous["adj_type"][(previous[PRICE_COLUMNS].to_numpy() != own).any(axis=1)]
+    others = others[others["adj_type"].isin(diverged)]
+
+    merged = df[["date"] + PRICE_COLUMNS].reset_index().merge(others, on="date", suffixes=("", "_other"))
+    same = (merged[PRICE_COLUMNS].to_numpy() == merged[[c + "_other" for c in PRICE_COLUMNS]].to_numpy()).all(axis=1)
+    return pd.Series(df.index.isin(merged["index"][same]), index=df.index)
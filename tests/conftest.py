@@ -0,0 +1,34 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.candlestick import CandlestickDB
+
+
+@pytest.fixture
+def db(tmp_path):
+    return CandlestickDB(str(tmp_path / "stocks.db"))
+
+
+@pytest.fixture
+def make_bars():
+    """Build a clean ascending series of API candlesticks, one per business day"""
+    def make(n, start="2024-01-01"):
+        bars = []
+        for i, day in enumerate(pd.bdate_range(start, periods=n)):
+            bars.append({
+                "date": day.strftime("%Y-%m-%dT00:00:00+08:00"),
+                "open": 10 + i * 0.1,
+                "close": 10.05 + i * 0.1,
+                "high": 10.2 + i * 0.1,
+                "low": 9.9 + i * 0.1,
+                "volume": 1000 + i * 10,
+                "amount": 10000.0,
+                "change": 0.01,
+                "to_r": 0.1,
+            })
+        return bars
+    return make
@@ -0,0 +1,155 @@
+import sqlite3
+
+import pytest
+
+from models.candlestick import CandlestickDB
+
+
+def stored_dates(db: CandlestickDB, stock_code: str = "00700"):
+    return db.get_candlesticks_df(stock_code)["date"].tolist()
+
+
+def test_ascending_incremental_upsert_with_context(db, make_bars):
+    bars = make_bars(17)
+    db.upsert_candlesticks("00700", bars[:14])
+    result = db.upsert_candlesticks("00700", bars[14:])
+    assert result["written"] == 3
+    assert result["quarantined"].empty
+    assert len(stored_dates(db)) == 17
+
+
+def test_descending_incremental_upsert_with_context(db, make_bars):
+    bars = make_bars(17)
+    db.upsert_candlesticks("00700", bars[:14][::-1])
+    result = db.upsert_candlesticks("00700", bars[14:][::-1])
+    assert result["written"] == 3
+    assert result["quarantined"].empty
+    assert len(stored_dates(db)) == 17
+
+
+def test_context_and_batch_in_different_iso_forms(db, make_bars):
+    bars = make_bars(31)
+    db.upsert_candlesticks("00700", [dict(bars[0], date=bars[0]["date"][:10])], validate=False)
+    result = db.upsert_candlesticks("00700", bars[1:])
+    assert result["written"] == 30
+    assert result["quarantined"].empty
+    assert len(stored_dates(db)) == 31
+
+
+def test_incremental_bar_is_checked_against_stored_history(db, make_bars):
+    bars = make_bars(21)
+    db.upsert_candlesticks("00700", bars[:20])
+    spike = dict(bars[20], volume=bars[20]["volume"] * 1000)
+    result = db.upsert_candlesticks("00700", [spike])
+    assert result["written"] == 0
+    assert result["quarantined"]["reasons"].tolist() == ["volume_spike"]
+
+
+def test_missing_and_garbage_dates_are_quarantined(db, make_bars):
+    good = make_bars(1)[0]
+    for bars in ([good, dict(good, date=None)],
+                 [dict(good, date=None), good],
+                 [good, dict(good, date="garbage")]):
+        result = db.upsert_candlesticks("00700", bars)
+        assert result["written"] == 1
+        assert result["quarantined"]["reasons"].tolist() == ["bad_date"]
+    assert db.get_quarantined_df()["date"].tolist() == ["garbage"]
+
+
+def test_later_clean_fetch_clears_quarantine(db, make_bars):
+    bars = make_bars(10)
+    bad = [dict(bar) for bar in bars]
+    bad[5]["high"] = bad[5]["low"] - 1
+    db.upsert_candlesticks("00700", bad)
+    assert db.get_quarantined_df("00700")["date"].tolist() == [bars[5]["date"]]
+    assert bars[5]["date"] not in stored_dates(db)
+
+    db.upsert_candlesticks("00700", bars[4:7])
+    assert db.get_quarantined_df("00700").empty
+    assert bars[5]["date"] in stored_dates(db)
+
+
+def test_quarantined_refetch_replaces_stored_row(db, make_bars):
+    bars = make_bars(10)
+    db.upsert_candlesticks("00700", bars)
+    db.upsert_candlesticks("00700", [dict(bars[5], close=0)])
+    assert bars[5]["date"] not in stored_dates(db)
+    assert db.get_quarantined_df("00700")["date"].tolist() == [bars[5]["date"]]
+
+
+def corrupt_store(db, make_bars):
+    """Store two clean 30-bar series per stock, then corrupt a few bars in place"""
+    for stock_code in ("00700", "600000"):
+        for adj_type in ("bc_rights", "ex_rights"):
+            db.upsert_candlesticks(stock_code, make_bars(30), adj_type)
+    dates = [bar["date"] for bar in make_bars(30)]
+    db.execute_query("UPDATE candlesticks SET low = 100 WHERE stock_code = '00700' AND adj_type = 'bc_rights' AND date = ?",
+                     (dates[3],))
+    db.execute_query("UPDATE candlesticks SET volume = 10000000 WHERE stock_code = '00700' AND adj_type = 'ex_rights' AND date = ?",
+                     (dates[25],))
+    db.execute_query("UPDATE candlesticks SET volume = 10000000 WHERE stock_code = '600000' AND adj_type = 'bc_rights' AND date = ?",
+                     (dates[12],))
+    return {("00700", "bc_rights", dates[3]), ("00700", "ex_rights", dates[25]), ("600000", "bc_rights", dates[12])}
+
+
+def test_audit_series_spanning_chunks(db, make_bars):
+    expected = corrupt_store(db, make_bars)
+    for chunksize in (7, 13, 1000):
+        flagged = db.audit(chunksize=chunksize)
+        assert set(zip(flagged["stock_code"], flagged["adj_type"], flagged["date"])) == expected
+
+
+def test_audit_quarantine_moves_flagged_bars(db, make_bars):
+    expected = corrupt_store(db, make_bars)
+    assert len(db.audit(chunksize=7, quarantine=True)) == len(expected)
+    assert db.audit().empty
+    quarantined = db.get_quarantined_df()
+    assert set(zip(quarantined["stock_code"], quarantined["adj_type"], quarantined["date"])) == expected
+
+
+def test_audit_empty_database(db):
+    assert db.audit().empty
+
+
+def test_failed_batch_leaves_both_tables_unchanged(db, make_bars):
+    bars = make_bars(10)
+    db.upsert_candlesticks("00700", bars)
+    quarantined = db.get_candlesticks_df("00700").iloc[:1].assign(stock_code="00700", adj_type="bc_rights",
+                                                                  reasons="outside_range")
+    with pytest.raises(sqlite3.OperationalError):
+        db.execute_batch([
+            db._quarantine_statement(quarantined),
+            ("DELETE FROM missing_table WHERE date = ?", [(bars[0]["date"],)]),
+        ])
+    assert db.get_quarantined_df().empty
+    assert len(stored_dates(db)) == 10
+
+
+def back_adjusted(bars, factor=2.0):
+    return [dict(bar, **{k: bar[k] * factor for k in ("open", "close", "high", "low")}) for bar in bars]
+
+
+def test_batch_repeating_diverged_adj_type_is_stale(db, make_bars):
+    bars = make_bars(20)
+    db.upsert_candlesticks("00700", bars, "ex_rights")
+    db.upsert_candlesticks("00700", back_adjusted(bars[:15]), "bc_rights")
+    result = db.upsert_candlesticks("00700", bars[15:], "bc_rights")
+    assert result["written"] == 0
+    assert set(result["quarantined"]["reasons"]) == {"stale_adj_type"}
+
+
+def test_batch_repeating_adj_type_before_divergence_is_clean(db, make_bars):
+    bars = make_bars(20)
+    db.upsert_candlesticks("00700", bars, "ex_rights")
+    db.upsert_candlesticks("00700", bars[:15], "bc_rights")
+    result = db.upsert_candlesticks("00700", bars[15:], "bc_rights")
+    assert result["written"] == 5
+
+
+def test_batch_repeating_adj_type_after_forward_adjustment_is_clean(db, make_bars):
+    # Forward adjustment rewrites old history only, so recent bars match again
+    bars = make_bars(20)
+    db.upsert_candlesticks("00700", bars, "ex_rights")
+    db.upsert_candlesticks("00700", back_adjusted(bars[:10]) + bars[10:15], "fc_rights")
+    result = db.upsert_candlesticks("00700", bars[15:], "fc_rights")
+    assert result["written"] == 5
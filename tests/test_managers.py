@@ -0,0 +1,46 @@
+from managers import StockDataManager
+
+
+class FakeAPI:
+    """Serve queued candlestick responses and record the requested ranges"""
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get_candlestick_data(self, stock_code, start_date, end_date=None, adj_type="bc_rights", market="hk"):
+        self.calls.append((start_date, end_date))
+        return {"code": 1, "data": self.responses.pop(0)}
+
+
+def make_manager(db, api):
+    manager = StockDataManager.__new__(StockDataManager)
+    manager.api = api
+    manager.candlestick_db = db
+    return manager
+
+
+def test_refetch_range_ignores_unparseable_dates(db, make_bars):
+    bars = make_bars(10)
+    first = [dict(bar) for bar in bars]
+    first[3]["close"] = 0
+    first[6]["date"] = "garbage"
+    api = FakeAPI(first, bars[3:4])
+    result = make_manager(db, api).update_candlestick_data("00700", "2024-01-01", "2024-01-12",
+                                                           force=True, refetch=True)
+    assert api.calls[1] == (bars[3]["date"][:10], bars[3]["date"][:10])
+    assert result["count"] == 9
+    assert result["quarantined"] == 1
+
+
+def test_refetch_count_when_refetch_quarantines_a_clean_bar(db, make_bars):
+    bars = make_bars(10)
+    first = [dict(bar) for bar in bars]
+    first[3]["close"] = 0
+    second = [dict(bar) for bar in bars[3:6]]
+    second[2]["high"] = second[2]["low"] - 1
+    api = FakeAPI(first, second)
+    result = make_manager(db, api).update_candlestick_data("00700", "2024-01-01", "2024-01-12",
+                                                           force=True, refetch=True)
+    assert result["count"] == 9
+    assert result["count"] == len(db.get_candlesticks_df("00700"))
+    assert result["quarantined"] == 1
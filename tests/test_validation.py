@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+
+from models.validation import candlesticks_to_df, find_bad_bars, find_cross_adj_repeats
+
+
+def reasons_of(bars, **kwargs):
+    return find_bad_bars(candlesticks_to_df(bars), **kwargs).tolist()
+
+
+def test_clean_series_passes(make_bars):
+    bars = make_bars(30)
+    assert reasons_of(bars) == [""] * 30
+    assert reasons_of(bars[::-1]) == [""] * 30
+
+
+def test_candlesticks_to_df_renames_turnover_rate(make_bars):
+    df = candlesticks_to_df(make_bars(1))
+    assert df.loc[0, "turnover_rate"] == 0.1
+
+
+@pytest.mark.parametrize("reason, mutate", [
+    ("bad_date", lambda bars: bars[5].update(date="garbage")),
+    ("missing_price", lambda bars: bars[5].update(close=None)),
+    ("non_positive_price", lambda bars: bars[5].update(low=0)),
+    ("high_below_low", lambda bars: bars[5].update(high=bars[5]["low"] - 1)),
+    ("outside_range", lambda bars: bars[5].update(open=bars[5]["high"] + 1)),
+    ("negative_volume", lambda bars: bars[5].update(volume=-1)),
+    ("duplicate_date", lambda bars: bars[5].update(date=bars[4]["date"])),
+    ("out_of_order", lambda bars: bars.insert(5, bars.pop(8))),
+    ("stale_repeat", lambda bars: bars[5].update({k: v for k, v in bars[4].items() if k != "date"})),
+    ("volume_spike", lambda bars: bars[8].update(volume=bars[8]["volume"] * 1000)),
+])
+def test_each_reason_is_flagged(make_bars, reason, mutate):
+    bars = make_bars(12)
+    mutate(bars)
+    reasons = reasons_of(bars)
+    flagged = [r for r in reasons if r]
+    assert len(flagged) == 1
+    assert reason in flagged[0].split(",")
+
+
+def test_suspended_day_is_not_stale(make_bars):
+    bars = make_bars(6)
+    bars[5].update({k: v for k, v in bars[4].items() if k != "date"})
+    bars[4]["volume"] = bars[5]["volume"] = 0
+    assert reasons_of(bars) == [""] * 6
+
+
+def test_volume_spike_needs_min_periods(make_bars):
+    bars = make_bars(6)
+    bars[3]["volume"] *= 1000
+    assert reasons_of(bars, volume_min_periods=5) == [""] * 6
+    assert "volume_spike" in reasons_of(bars, volume_min_periods=3)[3]
+
+
+def test_groups_are_checked_independently(make_bars):
+    df = pd.concat([
+        candlesticks_to_df(make_bars(10)).assign(stock_code="00700"),
+        candlesticks_to_df(make_bars(10)).assign(stock_code="600000"),
+    ], ignore_index=True)
+    assert (find_bad_bars(df, group_cols=["stock_code"]) == "").all()
+    assert "out_of_order" in find_bad_bars(df)[10]
+
+
+def test_mixed_iso_date_forms_parse(make_bars):
+    bars = make_bars(10)
+    bars[0]["date"] = bars[0]["date"][:10]
+    bars[1]["date"] = bars[1]["date"].replace("+08:00", "Z")
+    assert reasons_of(bars) == [""] * 10
+
+
+def test_cross_adj_repeats_need_diverged_history(make_bars):
+    df = candlesticks_to_df(make_bars(3))
+    others = df[["date", "open", "close", "high", "low"]].assign(adj_type="ex_rights")
+    others.loc[2, "close"] += 1
+    previous = pd.DataFrame({"adj_type": ["ex_rights"], "open": [1.0], "close": [1.0], "high": [1.0], "low": [1.0],
+                             "own_open": [2.0], "own_close": [2.0], "own_high": [2.0], "own_low": [2.0]})
+    assert find_cross_adj_repeats(df, others, previous).tolist() == [True, True, False]
+    same = previous.assign(own_open=1.0, own_close=1.0, own_high=1.0, own_low=1.0)
+    assert not find_cross_adj_repeats(df, others, same).any()